@@ -2,82 +2,75 @@
 # using the platform default clock (and default reset, if any).
 
 from amaranth import *
-from amaranth.build import Pins, Attrs, Connector
+from amaranth.build import Resource, Pins, Attrs, Connector
 from amaranth_boards.butterstick import *
 from amaranth_boards.resources import *
 
+from vccio import VccioCtrl
+
 # add_connectors
 
 class SygyzyPmodAdapter():
+    _PMOD_PINS = { "pmod_1a" : ["S12",  "S8",  "S4",  "S0", "-", "-", "S14", "S10",  "S6",  "S2", "-", "-"],
+                   "pmod_1b" : ["S13",  "S9",  "S5",  "S1", "-", "-", "S15", "S11",  "S7",  "S3", "-", "-"],
+                   "pmod_2a" : ["S28", "S24", "S20", "S16", "-", "-", "S30", "S26", "S22", "S18", "-", "-"],
+                   "pmod_2b" : ["S29", "S25", "S21", "S17", "-", "-", "S31", "S27", "S23", "S19", "-", "-"],
+    }
+
     def __init__(self, syzygy_name):
         self.syzygy_name = syzygy_name
+        self._connectors = None
 
     def connectors(self):
-        pmod_pins = { "pmod_1a" : ["S12",  "S8",  "S4",  "S0", "-", "-", "S14", "S10",  "S6",  "S2", "-", "-"],
-                      "pmod_1b" : ["S13",  "S9",  "S5",  "S1", "-", "-", "S15", "S11",  "S7",  "S3", "-", "-"],
-                      "pmod_2a" : ["S28", "S24", "S20", "S16", "-", "-", "S30", "S26", "S22", "S18", "-", "-"],
-                      "pmod_2b" : ["S29", "S25", "S21", "S17", "-", "-", "S31", "S27", "S23", "S19", "-", "-"],
-        }
-
-        connectors = []
-        for pmod in pmod_pins:
-            pin_str = ""
-            for pin in pmod_pins[pmod]:
-                pin_str += "{}:{} ".format(self.syzygy_name, pin)
-            connectors.append(Connector(pmod, 0, pin_str))
-        return connectors
+        if self._connectors is None:
+            self._connectors = [Connector(pmod, 0, " ".join(f"{self.syzygy_name}:{pin}" for pin in pins))
+                                for pmod, pins in self._PMOD_PINS.items()]
+        return self._connectors
 
 _pmod = [
-        *LEDResources("led_1a", pins="pmod_1a_0:1 pmod_1a_0:2 pmod_1a_0:3 pmod_1a_0:4 pmod_1a_0:7 pmod_1a_0:8 pmod_1a_0:9 pmod_1a_0:10", attrs=Attrs(IO_TYPE="LVCMOS33")),
-        *LEDResources("led_1b", pins="pmod_1b_0:1 pmod_1b_0:2 pmod_1b_0:3 pmod_1b_0:4 pmod_1b_0:7 pmod_1b_0:8 pmod_1b_0:9 pmod_1b_0:10", attrs=Attrs(IO_TYPE="LVCMOS33")),
-        *LEDResources("led_2a", pins="pmod_2a_0:1 pmod_2a_0:2 pmod_2a_0:3 pmod_2a_0:4 pmod_2a_0:7 pmod_2a_0:8 pmod_2a_0:9 pmod_2a_0:10", attrs=Attrs(IO_TYPE="LVCMOS33")),
-        *LEDResources("led_2b", pins="pmod_2b_0:1 pmod_2b_0:2 pmod_2b_0:3 pmod_2b_0:4 pmod_2b_0:7 pmod_2b_0:8 pmod_2b_0:9 pmod_2b_0:10", attrs=Attrs(IO_TYPE="LVCMOS33")),
+        Resource("led_bank_1a", 0, Pins("pmod_1a_0:1 pmod_1a_0:2 pmod_1a_0:3 pmod_1a_0:4 pmod_1a_0:7 pmod_1a_0:8 pmod_1a_0:9 pmod_1a_0:10", dir="o"), Attrs(IO_TYPE="LVCMOS33")),
+        Resource("led_bank_1b", 0, Pins("pmod_1b_0:1 pmod_1b_0:2 pmod_1b_0:3 pmod_1b_0:4 pmod_1b_0:7 pmod_1b_0:8 pmod_1b_0:9 pmod_1b_0:10", dir="o"), Attrs(IO_TYPE="LVCMOS33")),
+        Resource("led_bank_2a", 0, Pins("pmod_2a_0:1 pmod_2a_0:2 pmod_2a_0:3 pmod_2a_0:4 pmod_2a_0:7 pmod_2a_0:8 pmod_2a_0:9 pmod_2a_0:10", dir="o"), Attrs(IO_TYPE="LVCMOS33")),
+        Resource("led_bank_2b", 0, Pins("pmod_2b_0:1 pmod_2b_0:2 pmod_2b_0:3 pmod_2b_0:4 pmod_2b_0:7 pmod_2b_0:8 pmod_2b_0:9 pmod_2b_0:10", dir="o"), Attrs(IO_TYPE="LVCMOS33")),
 ]
 
-class VccioCtrl(Elaboratable):
-    def __init__(self, vccio_pins):
-        self.vccio_pins = vccio_pins
-        
-    def elaborate(self, platform):
-        m = Module()
-
-        pwm_timer = Signal(14)
-
-        m.d.sync += pwm_timer.eq(pwm_timer + 1)
-
-        m.d.comb += self.vccio_pins.pdm[0].eq(pwm_timer < int(2**14 * (0.10))) # 3.3V
-        m.d.comb += self.vccio_pins.pdm[1].eq(pwm_timer < int(2**14 * (0.10))) # 3.3V
-        m.d.comb += self.vccio_pins.pdm[2].eq(pwm_timer < int(2**14 * (0.70))) # 1.8V
-
-        m.d.comb += self.vccio_pins.en.eq(1)
-
-        return m
-
 class Shifty(Elaboratable):
+    # 4 banks x 8 LEDs
+    SHIFT_W = 32
+
     def elaborate(self, platform):
-        leds = []
-        for pmod in ["led_1a", "led_1b", "led_2a", "led_2b"]:
-            for pin in range(0,8):
-                leds.append(platform.request(pmod, pin))
+        # The banks are output-only, so each request only carries an .o
+        leds = Cat(platform.request(f"led_bank_{bank}").o for bank in ("1a", "1b", "2a", "2b"))
+        assert len(leds) == self.SHIFT_W
 
         m = Module()
 
         counter = Signal(23)
         m.d.sync += counter.eq(counter + 1)
+
+        # Registered wrap detect, so the wide compare is off the shifter's enable path.
+        tick = Signal()
+        m.d.sync += tick.eq(counter == (2**len(counter) - 1))
         
-        shifter = Signal(len(leds), reset=1)
-
-        index = 0
-        for led in leds:
-            m.d.comb += led.o.eq(shifter[index])
-            index += 1
-        with m.If(shifter == 0):
-            m.d.sync += shifter.eq(1)
-        with m.Elif(counter == 0):
-            m.d.sync += shifter.eq(shifter << 1)
+        # Rotating one-hot ring; no reset or init value so it can be packed as a
+        # shift register. The first tick shifts in the seed bit, later ticks
+        # rotate the top bit back around.
+        shifter = Signal(self.SHIFT_W, reset_less=True)
+        started = Signal(reset_less=True)
+
+        m.d.comb += leds.eq(shifter)
+        with m.If(tick):
+            m.d.sync += [
+                shifter.eq(Cat(Mux(started, shifter[-1], 1), shifter[:-1])),
+                started.eq(1),
+            ]
  
         vccio_ctrl = platform.request("vccio_ctrl", 0)
-        m.submodules.vccio_ctrl = VccioCtrl(vccio_ctrl)
+        m.submodules.vccio_ctrl = VccioCtrl(vccio_ctrl, pwm_timer=counter[:14], thresholds=(
+            int(2**14 * (0.10)), # 3.3V
+            int(2**14 * (0.10)), # 3.3V
+            int(2**14 * (0.70)), # 1.8V
+        ))
 
         return m
 
@@ -17,42 +17,15 @@ from amaranth.vendor.lattice_ecp5 import LatticeECP5Platform
 
 from amaranth_boards.butterstick import ButterStickPlatform as _ButterStickPlatform
 
+from vccio import VccioCtrl
 
-class VccioCtrl(Elaboratable):
-    def __init__(self, vccio_pins):
-        self.vccio_pins = vccio_pins
-
-    def _pwm_timer_limit(self, platform, instance):
-        voltage = platform.vccio_voltage(instance)
-        # constants per @tnt
-        # The PDM output would have an DC output impedance of 68k and can be modeled like a voltage source of 3.3V * x with a 68k in series. Then essentially you have 3 resistors connecting to FB :
-        #   One from that PDM source
-        #   One from VIO output with 53.6k
-        #   One from GND with 13k
-        # The regulator will fight for regulation and adjust its output such that the voltage node at its feedback connection is 0.6V.
-        # From there you can just use Kirchhoff's to derive the equation and solve for Vio.
-        limit_float = (3.546 - voltage) / 2.601
-        return int(limit_float * 2**14)
-        
-    def elaborate(self, platform):
-
-        m = Module()
-
-        if platform.vccio_voltage(0) is None:
-            logging.warning("VCCIO configuration is required for ULPI USB to function.")
-            return m
 
-        pwm_timer = Signal(14)
-        m.d.sync += pwm_timer.eq(pwm_timer + 1)
-        # SYGYZY 0
-        m.d.comb += self.vccio_pins.pdm[0].eq(pwm_timer < self._pwm_timer_limit(platform, 0))
-        # SYGYZY 1
-        m.d.comb += self.vccio_pins.pdm[1].eq(pwm_timer < self._pwm_timer_limit(platform, 1))
-        # SYGYZY 2 & ULPI USB (limit to 1.8V - 3.3V for USB3343) 
-        m.d.comb += self.vccio_pins.pdm[2].eq(pwm_timer < self._pwm_timer_limit(platform, 2))
-        m.d.comb += self.vccio_pins.en.eq(1)
-
-        return m
+# EHXPLLL feedback divider for each supported input clock frequency, in Hz.
+_PLL_PARAMS_PER_FREQ = {
+    62_000_000 : { "CLKFB_DIV" : 4 },
+    60_000_000 : { "CLKFB_DIV" : 4 },
+    30_000_000 : { "CLKFB_DIV" : 8 },
+}
 
 class LunaECP5DomainGenerator(LunaDomainGenerator):
     """ ECP5 clock domain generator for LUNA. Assumes a 60MHz input clock. """
@@ -122,23 +95,15 @@ class LunaECP5DomainGenerator(LunaDomainGenerator):
 
             input_clock = Signal()
             m.submodules += Instance("OSCG", p_DIV=self.OSCG_DIV, o_OSC=input_clock)
-            clock_frequency = 62.0
+            clock_frequency = 62e6
         else:
             input_clock = platform.request(clock_name)
 
-        pll_params_per_freq = {
-            "62000000.0" : { "CLKFB_DIV" : 4,
-            },
-            "60000000.0" : { "CLKFB_DIV" : 4,
-            },
-            "30000000.0" : { "CLKFB_DIV" : 8,
-            },
-        }
-
-        if not str(clock_frequency) in pll_params_per_freq:
+        clock_frequency_hz = int(round(clock_frequency))
+        if clock_frequency_hz not in _PLL_PARAMS_PER_FREQ:
             raise ValueError("Unsupported clock frequency {}MHz".format(clock_frequency/1e6))
 
-        pll_params = pll_params_per_freq[str(clock_frequency)]
+        pll_params = _PLL_PARAMS_PER_FREQ[clock_frequency_hz]
 
         # Instantiate the ECP5 PLL.
         # These constants generated by Clarity Designer; which will
@@ -223,9 +188,11 @@ class LunaECP5DomainGenerator(LunaDomainGenerator):
         # Set up our global resets so the system is kept fully in reset until
         # our core PLL is fully stable. This prevents us from internally clock
         # glitching ourselves before our PLL is locked. :)
+        pll_reset = Signal()
+        m.d.comb += pll_reset.eq(~self._pll_lock)
         m.d.comb += [
-            ResetSignal("sync").eq(~self._pll_lock),
-            ResetSignal("fast").eq(~self._pll_lock),
+            ResetSignal("sync").eq(pll_reset),
+            ResetSignal("fast").eq(pll_reset),
         ]
 
     def generate_usb_clock(self, m, platform):
@@ -288,10 +255,8 @@ class USBSerialDeviceExample(Elaboratable):
 
         m.d.comb += [
             # Place the streams into a loopback configuration...
-            usb_serial.tx.payload  .eq(usb_serial.rx.payload),
-            usb_serial.tx.valid    .eq(usb_serial.rx.valid),
-            usb_serial.tx.first    .eq(usb_serial.rx.first),
-            usb_serial.tx.last     .eq(usb_serial.rx.last),
+            Cat(usb_serial.tx.payload, usb_serial.tx.valid, usb_serial.tx.first, usb_serial.tx.last).eq(
+                Cat(usb_serial.rx.payload, usb_serial.rx.valid, usb_serial.rx.first, usb_serial.rx.last)),
             usb_serial.rx.ready    .eq(usb_serial.tx.ready),
 
             # ... and always connect by default.
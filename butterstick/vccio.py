@@ -0,0 +1,87 @@
+import logging
+
+from amaranth import *
+
+
+class VccioCtrl(Elaboratable):
+    """ PDM control of the ButterStick VCCIO regulators.
+
+    The duty cycle for each of the three banks is either given directly as a
+    14-bit threshold, or derived from a voltage via ``voltage_fn`` (which
+    defaults to the platform's ``vccio_voltage``).
+
+    A free-running 14-bit ``pwm_timer`` can be supplied (e.g. the low bits of a
+    counter the design already has); otherwise one is created here.
+    """
+
+    def __init__(self, vccio_pins, thresholds=None, voltage_fn=None, pwm_timer=None):
+        self.vccio_pins = vccio_pins
+        self.thresholds = thresholds
+        self.voltage_fn = voltage_fn
+        self.pwm_timer = pwm_timer
+
+    @staticmethod
+    def _pwm_timer_limit(voltage):
+        # constants per @tnt
+        # The PDM output would have an DC output impedance of 68k and can be modeled like a voltage source of 3.3V * x with a 68k in series. Then essentially you have 3 resistors connecting to FB :
+        #   One from that PDM source
+        #   One from VIO output with 53.6k
+        #   One from GND with 13k
+        # The regulator will fight for regulation and adjust its output such that the voltage node at its feedback connection is 0.6V.
+        # From there you can just use Kirchhoff's to derive the equation and solve for Vio.
+        # Evaluated in millivolts with integer arithmetic so the limit, and so the
+        # bitstream, doesn't depend on the host's float rounding.
+        voltage_mv = int(round(voltage * 1000))
+        return ((3546 - voltage_mv) * 2**14) // 2601
+
+    def elaborate(self, platform):
+        m = Module()
+
+        limits = self.thresholds
+        if limits is None:
+            voltage_fn = self.voltage_fn or platform.vccio_voltage
+            voltages = tuple(voltage_fn(i) for i in range(3))
+            if voltages[0] is None:
+                logging.warning("VCCIO configuration is required for ULPI USB to function.")
+                return m
+            limits = tuple(self._pwm_timer_limit(voltage) for voltage in voltages)
+
+        pwm_timer = self.pwm_timer
+        if pwm_timer is None:
+            # Two 7-bit halves with a registered carry between them, to keep the
+            # increment short. The high half steps one cycle after the low half
+            # wraps, which still visits every 14-bit value once per period.
+            pwm_lo = Signal(7)
+            pwm_hi = Signal(7)
+            pwm_carry = Signal()
+            m.d.sync += [
+                pwm_lo.eq(pwm_lo + 1),
+                pwm_carry.eq(pwm_lo == 2**len(pwm_lo) - 1),
+                pwm_hi.eq(pwm_hi + pwm_carry),
+            ]
+            pwm_timer = Cat(pwm_lo, pwm_hi)
+
+        # Compare against the bit-reversed counter (MPWM) so the pulses are spread
+        # across the period instead of forming one long low-frequency pulse.
+        pwm_rev = Cat(pwm_timer[13 - i] for i in range(14))
+
+        # One comparator per distinct threshold, in ascending order, shared by
+        # every bank that uses it.
+        below = {}
+        for limit in sorted(set(limits)):
+            below[limit] = Signal(name="pwm_below_{}".format(limit))
+            m.d.comb += below[limit].eq(pwm_rev < limit)
+
+        # Register the outputs so the pads are driven straight from a flop rather
+        # than from the end of the compare.
+        # pdm[0]: SYGYZY 0
+        # pdm[1]: SYGYZY 1
+        # pdm[2]: SYGYZY 2 & ULPI USB (limit to 1.8V - 3.3V for USB3343)
+        pdm_q = Signal(len(limits))
+        for i, limit in enumerate(limits):
+            m.d.sync += pdm_q[i].eq(below[limit])
+            m.d.comb += self.vccio_pins.pdm[i].eq(pdm_q[i])
+
+        m.d.comb += self.vccio_pins.en.eq(1)
+
+        return m